@@ -1,18 +1,19 @@
 
 import streamlit as st
-import fitz  # PyMuPDF
 import requests
 import hashlib
 from io import BytesIO
 from datetime import datetime
 from reportlab.lib.pagesizes import letter
 from reportlab.pdfgen import canvas
-from db import init_db, register_user, login_user, save_upload, get_user_history
+from db import init_db, register_user, login_user, save_upload, get_user_history, clause_search_available
+from clause_index import find_similar_clauses
+from red_flag_detector import scan_document
+from rule_packs import pack_for_document
+from llm_guard import single_flight, acquire_token, request_key, REQUEST_TIMEOUT
+from pdf_extract import DocumentText, open_upload, extract_pages, pages_needing_ocr, has_usable_text
 from gtts import gTTS   # 🎤 Voice summary
-from ui_theme import apply_theme, render_sidebar,st_card,button
-
-apply_theme()
-render_sidebar()
+from ui_theme import apply_theme, render_sidebar, st_card, load_static_asset, start_render_metrics, finish_render_metrics
 
 # Load Hugging Face token
 try:
@@ -25,6 +26,9 @@ init_db()
 
 # --- CONFIG ---
 st.set_page_config(page_title="LegalLite", layout="wide", page_icon="⚖️")
+start_render_metrics()
+apply_theme()
+render_sidebar()
 
 # --- HEADER BRANDING ---
 st.markdown("<h1 style='text-align: center; color: #3A6EA5;'>LegalLite ⚖️</h1>", unsafe_allow_html=True)
@@ -83,12 +87,17 @@ def query_huggingface_api(prompt):
     API_URL = "https://api-inference.huggingface.co/models/csebuetnlp/mT5_multilingual_XLSum"
     headers = {"Authorization": f"Bearer {hf_token}"}
 
-    try:
-        response = requests.post(API_URL, headers=headers, json={
+    def call():
+        acquire_token(hf_token)
+        return requests.post(API_URL, headers=headers, json={
             "inputs": prompt,
             "parameters": {"max_length": 200, "do_sample": False},
             "options": {"wait_for_model": True}
-        })
+        }, timeout=REQUEST_TIMEOUT)
+
+    try:
+        # identical prompts already in flight (other sessions / double clicks) share one call
+        response = single_flight(request_key(prompt, "huggingface", prompt, hf_token), call)
         if response.status_code != 200:
             return f"❌ API Error {response.status_code}: {response.text}"
 
@@ -103,19 +112,29 @@ def query_huggingface_api(prompt):
     except Exception as e:
         return f"❌ Exception: {str(e)}"
 
+# --- OPENAI CHAT WRAPPER ---
+def openai_chat(api_key, system_prompt, text):
+    def call():
+        acquire_token(api_key)
+        from openai import OpenAI
+        client = OpenAI(api_key=api_key, timeout=REQUEST_TIMEOUT)
+        response = client.chat.completions.create(
+            model="gpt-3.5-turbo",
+            messages=[
+                {"role": "system", "content": system_prompt},
+                {"role": "user", "content": text}
+            ]
+        )
+        return response.choices[0].message.content
+
+    return single_flight(request_key(text, "openai", system_prompt, api_key), call)
+
 # --- LOGIN SECTION ---
 def login_section():
     with st.container():
         st.subheader("🔐 Login to Your Account")
         email = st.text_input("Email")
         password = st.text_input("Password", type="password")
-        st.markdown("""
-        <style>
-        div.stButton > button:first-child {
-         color: #0888ff;          
-         }
-        </style>
-        """, unsafe_allow_html=True)
         if st.button("Login"):
             user = login_user(email, hash_password(password))
             if user:
@@ -135,34 +154,23 @@ def choose_mode():
     # initialize a session variable to hold temporary API input
     if "api_input" not in st.session_state:
         st.session_state.api_input = ""
-        st.markdown("""
-        <style>
-        div.stButton > button:first-child {
-         color: #0888ff;          
-         }
-        </style>
-        """, unsafe_allow_html=True)
     with col1:
-        button()
         if st.button("🧪 Demo Mode"):
             st.session_state.mode = "Demo Mode"
             st.session_state.mode_chosen = True
 
     with col2:
-        button()
         if st.button("🔐 Use Your API Key"):
             st.session_state.mode = "Use Your Own OpenAI API Key"
             st.session_state.mode_chosen = False  # wait for key entry
 
     with col3:
-        button()
         if st.button("🌐 Hugging Face"):
             st.session_state.mode = "Use Open-Source AI via Hugging Face"
             st.session_state.mode_chosen = True
 
     if st.session_state.mode == "Use Your Own OpenAI API Key" and not st.session_state.mode_chosen:
         st.session_state.api_input = st.text_input("Paste your OpenAI API Key", type="password")
-        button()
         if st.button("➡️ Continue"):
             if st.session_state.api_input.strip() == "":
                 st.warning("Please enter your API key.")
@@ -177,60 +185,98 @@ def signup_section():
         st.subheader("📝 Create an Account")
         email = st.text_input("New Email")
         password = st.text_input("New Password", type="password")
-        st.markdown("""
-        <style>
-        div.stButton > button:first-child {
-         color: #0888ff ;          
-         }
-        </style>
-        """, unsafe_allow_html=True)
         if st.button("Sign Up"):
             if register_user(email, hash_password(password)):
                 st.success("Account created! You can now login.")
             else:
                 st.error("User already exists.")  
 
-# --- RISKY TERMS FINDER ---
-def find_risky_terms(text):
-    risky_keywords = [
-        "penalty", "termination", "breach", "fine",
-        "automatic renewal", "binding arbitration",
-        "liquidated damages", "non-compete", "non-disclosure",
-        "late fee", "without notice", "waiver of rights",
-        "exclusive jurisdiction", "governing law", "intellectual property"
-    ]
-    found_terms = []
-    for keyword in risky_keywords:
-        if keyword.lower() in text.lower():
-            found_terms.append(keyword)
-    return list(set(found_terms))
+# --- EXTRACTED TEXT VIEWER ---
+# Only one window of pages is sent to the browser per rerun, however large the document is.
+VIEWER_PAGES = 2
+VIEWER_MAX_CHARS = 20000
+VIEWER_MAX_HITS = 100
+
+def extract_upload(uploaded_file, key):
+    """Pages and their lowercased texts, extracted once per upload.
+
+    Every page turn or hit jump in the viewer reruns the script; the result is kept
+    in session_state (one document per key) until a different file is uploaded.
+    """
+    cached = st.session_state.get(f"{key}_doc")
+    if cached is None or cached["file_id"] != uploaded_file.file_id:
+        with open_upload(uploaded_file) as doc:
+            pages = extract_pages(doc)
+        cached = {"file_id": uploaded_file.file_id, "pages": pages, "lower": [text.lower() for text in pages.texts()]}
+        st.session_state[f"{key}_doc"] = cached
+    return cached["pages"], cached["lower"]
+
+def find_hits(pages, pages_lower, terms):
+    hits = []
+    for term in terms:
+        needle = term.lower()
+        for page, text in zip(pages, pages_lower):
+            if needle in text:
+                hits.append((term, page["page"]))
+    return hits
+
+def viewer_window(pages, first_page):
+    window = pages[first_page - 1:first_page - 1 + VIEWER_PAGES]
+    return window, "".join([page["text"] for page in window])
+
+def render_text_viewer(pages, hits, key):
+    if not pages:
+        return
+    page_key, part_key = f"{key}_page", f"{key}_part"
+    if page_key not in st.session_state or st.session_state[page_key] > len(pages):
+        st.session_state[page_key] = 1
+    if part_key not in st.session_state:
+        st.session_state[part_key] = 1
+
+    def reset_part():
+        st.session_state[part_key] = 1
+
+    def jump_to_hit():
+        hit = st.session_state[f"{key}_hit"]
+        if hit:
+            st.session_state[page_key] = hit[1]
+            # open the part of an oversized window that actually contains the hit
+            offset = viewer_window(pages, hit[1])[1].lower().find(hit[0].lower())
+            st.session_state[part_key] = max(offset, 0) // VIEWER_MAX_CHARS + 1
+
+    col1, col2 = st.columns([1, 3])
+    with col1:
+        st.number_input(f"Page (of {len(pages)})", min_value=1, max_value=len(pages), step=VIEWER_PAGES,
+                        key=page_key, on_change=reset_part)
+    with col2:
+        st.selectbox("Jump to risk hit", [None] + hits[:VIEWER_MAX_HITS], key=f"{key}_hit", on_change=jump_to_hit,
+                     format_func=lambda hit: "—" if hit is None else f"{hit[0]} (p. {hit[1]})")
+
+    window, text = viewer_window(pages, st.session_state[page_key])
+    # very long pages are paged again by character offset, so nothing is ever cut off
+    parts = max(1, -(-len(text) // VIEWER_MAX_CHARS))
+    if st.session_state[part_key] > parts:
+        st.session_state[part_key] = 1
+    if parts > 1:
+        st.number_input(f"Part (of {parts})", min_value=1, max_value=parts, key=part_key)
+    offset = (st.session_state[part_key] - 1) * VIEWER_MAX_CHARS
+    text = text[offset:offset + VIEWER_MAX_CHARS]
+
+    st.text_area("", text, height=300)
+    st.caption(f"Showing page(s) {window[0]['page']}–{window[-1]['page']}"
+               f"{f', part {st.session_state[part_key]} of {parts}' if parts > 1 else ''} · "
+               f"{len(text.encode()) / 1024:.1f} KB sent")
 
 # --- AI RISK TERMS ---
 def ai_risk_analysis(text, api_key):
     try:
-        from openai import OpenAI
-        client = OpenAI(api_key=api_key)
-        response = client.chat.completions.create(
-            model="gpt-3.5-turbo",
-            messages=[
-                {"role": "system", "content": "You are a legal risk analysis assistant. Identify clauses in contracts that could pose legal or financial risks to the signer, explain why, and suggest ways to mitigate them."},
-                {"role": "user", "content": text}
-            ]
-        )
-        return response.choices[0].message.content
+        return openai_chat(api_key, "You are a legal risk analysis assistant. Identify clauses in contracts that could pose legal or financial risks to the signer, explain why, and suggest ways to mitigate them.", text)
     except Exception as e:
         return f"❌ AI Analysis failed: {e}"
 
 
 # --- MAIN APP ---
 def app_main():
-    st.markdown("""
-        <style>
-        div.stButton > button:first-child {
-         color: #0888ff ;          
-         }
-        </style>
-        """, unsafe_allow_html=True)
     if st.button("◀️ Back to Mode Selection"):
         st.session_state.mode_chosen = False
         st.session_state.mode = ""
@@ -238,18 +284,11 @@ def app_main():
         return
 
     st.sidebar.title("🔍 Navigation")
-    choice = st.sidebar.radio("Go to", [ "📑 Upload & Simplify","👤 Profile","🚨 Risky Terms Detector",  "⏳ My History", "❓ Help & Feedback"])
+    choice = st.sidebar.radio("Go to", [ "📑 Upload & Simplify","👤 Profile","🚨 Risky Terms Detector",  "⏳ My History", "❓ Help & Feedback"], key="nav")
 
     if choice == "👤 Profile":
         st.subheader("👤 Your Profile")
         st.write(f"**Logged in as:** `{st.session_state.user_email}`")
-        st.markdown("""
-        <style>
-        div.stButton > button:first-child {
-         color: #0888ff;          
-         }
-        </style>
-        """, unsafe_allow_html=True)   
         if st.button("🚪 Logout"):
             st.session_state.logged_in = False
             st.session_state.user_email = ""
@@ -258,6 +297,7 @@ def app_main():
     if choice == "📑 Upload & Simplify":
         st.subheader("📑 Upload Your Legal Document (PDF)")
         uploaded_file = st.file_uploader("Select a legal PDF", type=["pdf"])
+        pages = DocumentText([])
 
         if uploaded_file:
             doc_name = uploaded_file.name.lower()
@@ -266,23 +306,27 @@ def app_main():
                 return
             try:
                 with st.spinner("Reading and extracting text..."):
-                    doc = fitz.open(stream=uploaded_file.read(), filetype="pdf")
-                    full_text = "".join([page.get_text() for page in doc])
-                st.success("✅ Text extracted from PDF.")
+                    # page texts stay separate; the full string is only joined for the LLM calls
+                    pages, pages_lower = extract_upload(uploaded_file, key="upload_viewer")
+                if not has_usable_text(pages):
+                    st.error("❌ This PDF has no text layer (scanned/image-only). Please upload a text-based PDF.")
+                else:
+                    st.success("✅ Text extracted from PDF.")
+                scanned = pages_needing_ocr(pages)
+                if scanned:
+                    st.warning(f"⚠️ No readable text on page(s): {', '.join(map(str, scanned))}")
                 with st.expander("📄 View Extracted Text"):
-                    st.text_area("", full_text, height=300)
+                    scan = scan_document(pages, pack_for_document(uploaded_file.name))
+                    hits = find_hits(pages, pages_lower, scan["risky_terms"] + [flag["clause"] for flag in scan["red_flags"]])
+                    render_text_viewer(pages, hits, key="upload_viewer")
             except Exception as e:
                 st.error(f"❌ Error reading PDF: {str(e)}")
                 return
-        st.markdown("""
-        <style>
-        div.stButton > button:first-child {
-         color: #0888ff;          
-         }
-        </style>
-        """, unsafe_allow_html=True)
         if st.button("🧐 Simplify Document"):
                 simplified = None
+                if st.session_state.mode != "Demo Mode" and not has_usable_text(pages):
+                    st.error("❌ Nothing to simplify: no extractable text in this document.")
+                    return
                 if st.session_state.mode == "Use Your Own OpenAI API Key":
                      if not st.session_state.api_key:
                          st.error("❌ API key not found. Please go back and enter your key.")
@@ -290,23 +334,14 @@ def app_main():
                          
                      try:
                          st.warning("✅ Entered OpenAI summarization block")
-                         from openai import OpenAI
-                         client=OpenAI(api_key = st.session_state.api_key)
-                         response = client.chat.completions.create(
-                             model = "gpt-3.5-turbo",
-                             messages=[
-                                 {"role":"system","content": "You are a legal assistant. Simplify legal documents in plain English."},
-                                 {"role": "user", "content": full_text}
-                             ]
-                         )
-                         simplified = response.choices[0].message.content
+                         simplified = openai_chat(st.session_state.api_key, "You are a legal assistant. Simplify legal documents in plain English.", str(pages))
                          
                      except Exception as e:
                          st.error(f"❌ OpenAI Error: {str(e)}")
                          return
                         
                 elif st.session_state.mode == "Use Open-Source AI via Hugging Face":
-                    prompt = f"""Summarize the following document in bullet points:\n\n{full_text}"""
+                    prompt = f"""Summarize the following document in bullet points:\n\n{pages}"""
                     with st.spinner("Simplifying using Hugging Face..."):
                         simplified = query_huggingface_api(prompt)
 
@@ -359,16 +394,9 @@ In short: This contract outlines Priya’s job, salary, rules during and after e
                 if simplified:
                         st.subheader("✅ Simplified Summary")
                         st.success(simplified)
-                        save_upload(st.session_state.user_email, uploaded_file.name, simplified)
+                        save_upload(st.session_state.user_email, uploaded_file.name, simplified, pages)
                         # PDF download
                         pdf_file = generate_pdf(simplified, uploaded_file.name)
-                        st.markdown("""
-                                <style>
-                                div.stDownloadButton> button:first-child {
-                                color: #0888ff ;          
-                                 }
-                                </style>
-                                """, unsafe_allow_html=True)
                         st.download_button(
                             label="📥 Download Summary as PDF",
                             data=pdf_file,
@@ -381,13 +409,6 @@ In short: This contract outlines Priya’s job, salary, rules during and after e
                             with open(audio_file_path, "rb") as audio_file:
                                 audio_bytes = audio_file.read()
                                 st.audio(audio_bytes, format="audio/mp3")
-                                st.markdown("""
-                                <style>
-                                 div.stDownload> button:first-child {
-                                 color: #0888ff;          
-                                  }
-                                </style>
-                                """, unsafe_allow_html=True)
                                 st.download_button(
                                     label="🎧 Download Voice Summary",
                                     data=audio_bytes,
@@ -404,6 +425,20 @@ In short: This contract outlines Priya’s job, salary, rules during and after e
             for file_name, summary, timestamp in history:
                 with st.expander(f"📄 {file_name} | 🕒 {timestamp}"):
                     st.text(summary)
+
+            st.markdown("### 🔎 Where have we seen this clause before?")
+            if not clause_search_available():
+                st.info("ℹ️ Similar-clause search is not available in multi-replica deployments yet.")
+                clause_query = ""
+            else:
+                clause_query = st.text_area("Paste a clause", height=100)
+            if clause_query.strip():
+                matches = find_similar_clauses(st.session_state.user_email, clause_query, k=5)
+                if not matches:
+                    st.info("No similar clauses in your past uploads.")
+                for match in matches:
+                    st.markdown(f"**{match['filename']}** | 🕒 {match['timestamp']} | similarity {match['score']:.2f}")
+                    st.caption(match["clause"])
                     
     if choice == "❓ Help & Feedback":
       st.subheader("❓ Help & Feedback")
@@ -419,56 +454,35 @@ In short: This contract outlines Priya’s job, salary, rules during and after e
       Below is a visual guide to how LegalLite works:
       """)
 
-      st.image("flowchart.jpeg.jpeg", caption="LegalLite App Flow", width =500)
+      st.image(load_static_asset("flowchart.jpeg.jpeg"), caption="LegalLite App Flow", width =500)
   
       st.markdown("### 📂 Download Predefined Demo Files")
 
       col1, col2, col3 = st.columns(3)
 
       with col1:
-          with open("Sample_Rental_Agreement.pdf", "rb") as file:
-              st.markdown(""" <style>
-              div.stDownloadButton> button:first-child {
-              color: #0888ff ;          
-              }
-              </style>
-              """, unsafe_allow_html=True)
-              st.download_button(
-                  label="🏠 Rental", 
-                  data=file, 
-                  file_name="Sample_Rental_Agreement.pdf", 
-                  mime="application/pdf"
-              )
+          st.download_button(
+              label="🏠 Rental", 
+              data=load_static_asset("Sample_Rental_Agreement.pdf"), 
+              file_name="Sample_Rental_Agreement.pdf", 
+              mime="application/pdf"
+          )
 
       with col2:
-          with open("Sample_NDA_Agreement.pdf", "rb") as file:
-              st.markdown(""" <style>
-              div.stDownloadButton> button:first-child {
-              color: #0888ff;          
-              }
-              </style>
-              """, unsafe_allow_html=True)          
-              st.download_button(
-                  label="🔒 NDA", 
-                  data=file, 
-                  file_name="Sample_NDA_Agreement.pdf", 
-                  mime="application/pdf"
-              )
+          st.download_button(
+              label="🔒 NDA", 
+              data=load_static_asset("Sample_NDA_Agreement.pdf"), 
+              file_name="Sample_NDA_Agreement.pdf", 
+              mime="application/pdf"
+          )
 
       with col3:
-          with open("Sample_Employment_Contract.pdf", "rb") as file:
-              st.markdown(""" <style>
-              div.stDownloadButton> button:first-child {
-              color: #0888ff ;          
-              }
-              </style>
-              """, unsafe_allow_html=True)
-              st.download_button(
-                  label="🧑‍💼 Employment", 
-                  data=file, 
-                  file_name="Sample_Employment_Contract.pdf", 
-                  mime="application/pdf"
-              )
+          st.download_button(
+              label="🧑‍💼 Employment", 
+              data=load_static_asset("Sample_Employment_Contract.pdf"), 
+              file_name="Sample_Employment_Contract.pdf", 
+              mime="application/pdf"
+          )
 
         
     if choice == "🚨 Risky Terms Detector":
@@ -478,23 +492,34 @@ In short: This contract outlines Priya’s job, salary, rules during and after e
         if uploaded_file:
             try:
                 # --- Extract PDF text ---
-                doc = fitz.open(stream=uploaded_file.read(), filetype="pdf")
-                full_text = "".join([page.get_text() for page in doc])
-
-                # --- Step 1: Keyword Scan ---
-                risky = find_risky_terms(full_text)
+                pages, pages_lower = extract_upload(uploaded_file, key="risk_viewer")
+                scanned = pages_needing_ocr(pages)
+                if scanned:
+                    st.warning(f"⚠️ No readable text on page(s): {', '.join(map(str, scanned))}")
+
+                # --- Step 1: Rule-pack Scan (keywords + red flags) ---
+                scan = scan_document(pages, pack_for_document(uploaded_file.name))
+                risky = scan["risky_terms"]
                 if risky:
                     st.error("❗Risky Terms Found:")
                     for term in risky:
                         st.markdown(f"- **{term}**")
                 else:
                     st.success("✅ No risky terms detected based on keyword scan.")
+                for flag in scan["red_flags"]:
+                    st.warning(f"🚩 {flag['risk']}: \"{flag['clause']}\"")
+                st.caption(f"Rule pack: {scan['pack']}")
+                with st.expander("📄 View Risk Hits in Document"):
+                    hits = find_hits(pages, pages_lower, risky + [flag["clause"] for flag in scan["red_flags"]])
+                    render_text_viewer(pages, hits, key="risk_viewer")
 
                 # --- Step 2: Optional AI Analysis ---
-                if st.session_state.mode == "Use Your Own OpenAI API Key" and st.session_state.api_key:
+                if not has_usable_text(pages):
+                    st.info("ℹ️ AI risk analysis skipped: no extractable text in this document.")
+                elif st.session_state.mode == "Use Your Own OpenAI API Key" and st.session_state.api_key:
                     if st.button("🤖 Run AI Risk Analysis"):
                         with st.spinner("Running AI risk analysis..."):
-                            ai_result = ai_risk_analysis(full_text, st.session_state.api_key)
+                            ai_result = ai_risk_analysis(str(pages), st.session_state.api_key)
                             st.subheader("🧠 AI Risk Analysis Result")
                             st.write(ai_result)
                 elif st.session_state.mode != "Use Your Own OpenAI API Key":
@@ -520,3 +545,11 @@ else:
 # --- FOOTER ---
 st.markdown("<hr><p style='text-align: center; color: gray; font-size: 11px;'>⚡DISCLAMER!! LegalLite does not replace the professional legal advise it is only made to make legal information more more accessible and less intimating.</p><p style='text-align: center; color: gray; font-size: 11px;'> It is important to note that we are NOT responsible for any information that might be used as actuall legal advise.</p>", unsafe_allow_html=True)
 st.markdown("<hr><p style='text-align: center; color: gray;'>© 2025 LegalLite. Built with ❤️ in Streamlit.</p>", unsafe_allow_html=True)
+
+# --- RENDER METRICS ---
+if not st.session_state.logged_in:
+    finish_render_metrics("Login")
+elif not st.session_state.mode_chosen:
+    finish_render_metrics("Mode Selection")
+else:
+    finish_render_metrics(st.session_state.get("nav", ""))
@@ -0,0 +1,229 @@
+import os
+import re
+import json
+import zlib
+import hashlib
+import threading
+from datetime import datetime
+from typing import List, Dict
+
+import numpy as np
+
+INDEX_DIR = "clause_index"
+DIM = 256          # hashed feature space
+SIG_WORDS = 4      # 256-bit SimHash signature per clause: 32 MB per 1M clauses
+CANDIDATES = 4096  # signature shortlist that gets re-ranked with the int8 vectors
+MIN_CLAUSE_CHARS = 40
+
+_TOKEN_RE = re.compile(r"[a-z0-9]+")
+_CLAUSE_SPLIT_RE = re.compile(r"\n\s*\n|(?<=[.;:])\s+(?=(?:\(?[0-9a-z]{1,3}[.)]\s+)?[A-Z])")
+_write_lock = threading.Lock()
+
+
+def _paths(email: str) -> Dict[str, str]:
+    key = hashlib.sha256(email.strip().lower().encode()).hexdigest()[:16]
+    base = os.path.join(INDEX_DIR, key)
+    return {"sig": base + ".sig", "vec": base + ".i8", "off": base + ".off", "meta": base + ".jsonl",
+            "df": base + ".df", "docs": base + ".docs"}
+
+
+def split_clauses(text: str) -> List[str]:
+    """Split a contract into clause-sized chunks (paragraphs / sentences)."""
+    clauses = []
+    for part in _CLAUSE_SPLIT_RE.split(text or ""):
+        clause = " ".join(part.split())
+        if len(clause) >= MIN_CLAUSE_CHARS:
+            clauses.append(clause)
+    return clauses
+
+
+def _hashed_counts(text: str) -> np.ndarray:
+    vec = np.zeros(DIM, dtype=np.float32)
+    for token in _TOKEN_RE.findall(text.lower()):
+        # crc32 rather than hash(): must be stable across processes
+        vec[zlib.crc32(token.encode()) % DIM] += 1.0
+    return vec
+
+
+def _hyperplanes() -> np.ndarray:
+    # +/-1 hyperplanes derived from sha256, so signatures never depend on an RNG implementation
+    bits = [np.unpackbits(np.frombuffer(hashlib.sha256(b"plane%d" % i).digest(), dtype=np.uint8))[:DIM]
+            for i in range(SIG_WORDS * 64)]
+    return np.stack(bits).astype(np.float32) * 2 - 1
+
+
+_PLANES = _hyperplanes()
+
+
+def _signatures(rows: np.ndarray) -> np.ndarray:
+    """SimHash: one bit per hyperplane; Hamming distance approximates the angle between vectors."""
+    bits = np.packbits((rows @ _PLANES.T) > 0, axis=1)
+    return np.ascontiguousarray(bits).view(np.uint64)
+
+
+def _quantize(rows: np.ndarray) -> np.ndarray:
+    # rows are L2-normalised and non-negative, so every component is in [0, 1]
+    return np.round(rows * 127).astype(np.int8)
+
+
+def _normalize(vec: np.ndarray) -> np.ndarray:
+    norm = np.linalg.norm(vec)
+    return vec / norm if norm > 0 else vec
+
+
+def _load_df(path: str) -> np.ndarray:
+    # last slot holds the number of indexed clauses
+    if os.path.exists(path):
+        return np.fromfile(path, dtype=np.int64)
+    return np.zeros(DIM + 1, dtype=np.int64)
+
+
+def _idf(df: np.ndarray) -> np.ndarray:
+    return (np.log((1.0 + df[DIM]) / (1.0 + df[:DIM])) + 1.0).astype(np.float32)
+
+
+def _doc_key(filename: str, text: str) -> str:
+    return hashlib.sha256(f"{filename}\0{text}".encode()).hexdigest()
+
+
+def _indexed_docs(path: str) -> set:
+    # one "<doc key> <clause count after it>" line per indexed upload
+    if not os.path.exists(path):
+        return set()
+    with open(path) as f:
+        return {line.split()[0] for line in f if line.strip()}
+
+
+def _rollback(paths: Dict[str, str], committed: int):
+    """Cut every per-row file back to the `committed` clauses recorded in the .df file.
+
+    index_document appends to several files and commits by replacing .df last, so a
+    crash part-way leaves extra rows behind; without this they would stay out of step.
+    """
+    offsets = np.fromfile(paths["off"], dtype=np.uint64) if os.path.exists(paths["off"]) else []
+    if len(offsets) > committed:
+        os.truncate(paths["meta"], int(offsets[committed]))
+    for key, row_bytes in (("off", 8), ("vec", DIM), ("sig", SIG_WORDS * 8)):
+        if os.path.exists(paths[key]) and os.path.getsize(paths[key]) > committed * row_bytes:
+            os.truncate(paths[key], committed * row_bytes)
+    if os.path.exists(paths["docs"]):
+        with open(paths["docs"]) as f:
+            lines = f.readlines()
+        # lines without a count predate it and were written after their rows were committed
+        kept = [line for line in lines if len(line.split()) < 2 or int(line.split()[1]) <= committed]
+        if len(kept) < len(lines):
+            with open(paths["docs"], "w") as f:
+                f.writelines(kept)
+
+
+def index_document(email: str, filename: str, text: str) -> int:
+    """Append the clauses of one upload to the user's index. Returns clauses added.
+
+    Re-saving the same (filename, text) - e.g. simplifying it again - is a no-op.
+    """
+    clauses = split_clauses(text)
+    if not clauses:
+        return 0
+    doc_key = _doc_key(filename, text)
+
+    counts = np.stack([_hashed_counts(c) for c in clauses])
+    # sublinear TF, L2-normalised; IDF weights are applied at signing and search time
+    rows = np.log1p(counts)
+    norms = np.linalg.norm(rows, axis=1, keepdims=True)
+    rows = np.divide(rows, norms, out=np.zeros_like(rows), where=norms > 0)
+
+    timestamp = datetime.now().strftime("%Y-%m-%d %H:%M:%S")
+    paths = _paths(email)
+
+    with _write_lock:
+        os.makedirs(INDEX_DIR, exist_ok=True)
+        df = _load_df(paths["df"])
+        _rollback(paths, int(df[DIM]))
+        if doc_key in _indexed_docs(paths["docs"]):
+            return 0
+
+        df[:DIM] += (counts > 0).sum(axis=0)
+        df[DIM] += len(clauses)
+        # signed with the IDF as of now, as queries are: raw TF would let "the/shall/of"
+        # decide the shortlist and the best IDF match could miss it
+        sigs = _signatures(rows * _idf(df))
+
+        offsets = []
+        with open(paths["meta"], "ab") as meta:
+            pos = meta.tell()
+            for clause in clauses:
+                line = json.dumps({"clause": clause, "filename": filename, "timestamp": timestamp}).encode() + b"\n"
+                offsets.append(pos)
+                meta.write(line)
+                pos += len(line)
+        with open(paths["off"], "ab") as off:
+            off.write(np.asarray(offsets, dtype=np.uint64).tobytes())
+        with open(paths["vec"], "ab") as vec:
+            vec.write(_quantize(rows).tobytes())
+        with open(paths["sig"], "ab") as sig:
+            sig.write(sigs.tobytes())
+        with open(paths["docs"], "a") as docs:
+            docs.write(f"{doc_key} {df[DIM]}\n")
+
+        # commit: the new clause count in .df is what readers and _rollback trust
+        df.tofile(paths["df"] + ".tmp")
+        os.replace(paths["df"] + ".tmp", paths["df"])
+
+    return len(clauses)
+
+
+def find_similar_clauses(email: str, query: str, k: int = 5) -> List[Dict]:
+    """Top-k clauses from the user's past uploads most similar to `query`.
+
+    Signatures (of IDF-weighted vectors) shortlist CANDIDATES clauses by Hamming
+    distance, then those are re-ranked by IDF-weighted cosine on their int8 vectors.
+    """
+    paths = _paths(email)
+    if not os.path.exists(paths["sig"]) or os.path.getsize(paths["sig"]) == 0:
+        return []
+
+    sigs = np.memmap(paths["sig"], dtype=np.uint64, mode="r")
+    sigs = sigs[: (sigs.size // SIG_WORDS) * SIG_WORDS].reshape(-1, SIG_WORDS)
+    vectors = np.memmap(paths["vec"], dtype=np.int8, mode="r")
+    vectors = vectors[: (vectors.size // DIM) * DIM].reshape(-1, DIM)
+    offsets = np.memmap(paths["off"], dtype=np.uint64, mode="r")
+    df = _load_df(paths["df"])
+    # rows past the committed count belong to a save still in progress (or one that crashed)
+    n = min(len(sigs), len(vectors), len(offsets), int(df[DIM]))
+    if n == 0:
+        return []
+
+    tf = np.log1p(_hashed_counts(query))
+    if not tf.any():
+        return []
+    q = _normalize(tf * _idf(df))
+
+    qsig = _signatures(q[None, :])[0]
+    # word by word: much faster than popcounting the (n, 4) block and summing along rows
+    distances = np.bitwise_count(sigs[:n, 0] ^ qsig[0]).astype(np.uint16)
+    for word in range(1, SIG_WORDS):
+        distances += np.bitwise_count(sigs[:n, word] ^ qsig[word])
+    if n > CANDIDATES:
+        # distances are small integers: a histogram gives the cut-off without a full partition
+        cutoff = np.searchsorted(np.cumsum(np.bincount(distances)), CANDIDATES)
+        closer = np.flatnonzero(distances < cutoff)
+        ties = np.flatnonzero(distances == cutoff)[: CANDIDATES - len(closer)]
+        candidates = np.sort(np.concatenate([closer, ties]))
+    else:
+        candidates = np.arange(n)
+
+    scores = (vectors[candidates].astype(np.float32) @ q) / 127
+    k = min(k, len(candidates))
+    best = np.argpartition(-scores, k - 1)[:k]
+    best = best[np.argsort(-scores[best])]
+    top = candidates[best]
+    scores = dict(zip(top.tolist(), scores[best].tolist()))
+
+    results = []
+    with open(paths["meta"], "rb") as meta:
+        for i in top:
+            meta.seek(int(offsets[i]))
+            entry = json.loads(meta.readline())
+            entry["score"] = scores[int(i)]
+            results.append(entry)
+    return results
@@ -0,0 +1,110 @@
+import time
+import hashlib
+import threading
+from typing import Callable, Dict
+
+# Per-API-key request budget: sustained rate and how big a burst may be
+RATE_PER_SEC = 1.0
+BURST = 5
+
+# Upstream HTTP timeout, and how long a follower waits for the leader before giving up
+REQUEST_TIMEOUT = 60
+WAIT_TIMEOUT = 2 * REQUEST_TIMEOUT
+# Longest wait for a rate-limit token: a leader that gets one still answers within WAIT_TIMEOUT
+RATE_WAIT_TIMEOUT = WAIT_TIMEOUT - REQUEST_TIMEOUT
+
+
+def request_key(document: str, mode: str, prompt: str, api_key: str) -> str:
+    """Identity of an LLM request: (credential hash, document hash, mode, prompt hash).
+
+    The credential is part of the key so a call (its billing, rate budget and
+    errors) is only ever shared between callers using the same key.
+    """
+    key_hash = hashlib.sha256((api_key or "").encode()).hexdigest()
+    doc_hash = hashlib.sha256(document.encode()).hexdigest()
+    prompt_hash = hashlib.sha256(prompt.encode()).hexdigest()
+    return f"{key_hash}:{doc_hash}:{mode}:{prompt_hash}"
+
+
+# --- SINGLE-FLIGHT ---
+class _Call:
+    def __init__(self):
+        self.done = threading.Event()
+        self.result = None
+        self.error = None
+
+
+_inflight: Dict[str, _Call] = {}
+_inflight_lock = threading.Lock()
+
+
+def single_flight(key: str, fn: Callable, timeout: float = WAIT_TIMEOUT):
+    """Run fn() once per key at a time; concurrent callers with the same key wait for the leader's result.
+
+    Followers give up with TimeoutError after `timeout` seconds.
+    """
+    with _inflight_lock:
+        call = _inflight.get(key)
+        leader = call is None
+        if leader:
+            call = _inflight[key] = _Call()
+
+    if not leader:
+        if not call.done.wait(timeout):
+            raise TimeoutError(f"Identical request still running after {timeout}s")
+        if call.error is not None:
+            raise call.error
+        return call.result
+
+    try:
+        call.result = fn()
+        return call.result
+    except Exception as e:
+        call.error = e
+        raise
+    finally:
+        with _inflight_lock:
+            del _inflight[key]
+        call.done.set()
+
+
+# --- RATE LIMITING ---
+class TokenBucket:
+    def __init__(self, rate: float = RATE_PER_SEC, capacity: int = BURST):
+        self.rate = rate
+        self.capacity = capacity
+        self.tokens = float(capacity)
+        self.updated = time.monotonic()
+        self.lock = threading.Lock()
+
+    def acquire(self, timeout: float = RATE_WAIT_TIMEOUT):
+        """Block until a token is available, so bursts queue instead of failing.
+
+        Raises TimeoutError once no token can be had within `timeout` seconds.
+        """
+        deadline = time.monotonic() + timeout
+        while True:
+            with self.lock:
+                now = time.monotonic()
+                self.tokens = min(self.capacity, self.tokens + (now - self.updated) * self.rate)
+                self.updated = now
+                if self.tokens >= 1:
+                    self.tokens -= 1
+                    return
+                wait = (1 - self.tokens) / self.rate
+            if now + wait > deadline:
+                raise TimeoutError(f"Rate limit: too many requests for this API key, no slot within {timeout}s")
+            time.sleep(wait)
+
+
+_buckets: Dict[str, TokenBucket] = {}
+_buckets_lock = threading.Lock()
+
+
+def acquire_token(api_key: str, timeout: float = RATE_WAIT_TIMEOUT):
+    key = hashlib.sha256((api_key or "").encode()).hexdigest()
+    with _buckets_lock:
+        bucket = _buckets.get(key)
+        if bucket is None:
+            bucket = _buckets[key] = TokenBucket()
+    bucket.acquire(timeout)
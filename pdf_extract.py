@@ -0,0 +1,174 @@
+import os
+import sys
+import time
+import logging
+import hashlib
+import tempfile
+from io import BytesIO
+from collections.abc import Sequence
+from contextlib import contextmanager
+from typing import Callable, List, Dict, Optional
+
+import fitz  # PyMuPDF
+
+# Off-page text is clipped and images are not kept (as in the "text" default).
+# Unlike the default, ligatures are expanded and odd whitespace (tabs, nbsp) becomes
+# plain spaces, so keyword/regex scans match "ﬁne" or "late\xa0fee". Speed is the same.
+EXTRACT_FLAGS = fitz.TEXT_MEDIABOX_CLIP
+
+# Pages with fewer non-whitespace characters than this are treated as having no usable text layer
+MIN_PAGE_CHARS = 20
+
+log = logging.getLogger("legallite.pdf")
+
+_ocr_hook: Optional[Callable[["fitz.Page"], str]] = None
+
+
+def set_ocr_hook(hook: Optional[Callable[["fitz.Page"], str]]):
+    """Register a callable(page) -> text used for image-only / low-text pages (None disables OCR)."""
+    global _ocr_hook
+    _ocr_hook = hook
+
+
+class DocumentText(Sequence):
+    """Per-page texts of one document; the full string is only built when asked for (str())."""
+
+    def __init__(self, pages: List[Dict]):
+        self.pages = pages
+
+    def __getitem__(self, index):
+        return self.pages[index]
+
+    def __len__(self):
+        return len(self.pages)
+
+    def __str__(self):
+        return "".join([page["text"] for page in self.pages])
+
+    def texts(self):
+        for page in self.pages:
+            yield page["text"]
+
+    def digest(self) -> str:
+        """sha256 of the joined text, computed page by page."""
+        h = hashlib.sha256()
+        for text in self.texts():
+            h.update(text.encode())
+        return h.hexdigest()
+
+
+@contextmanager
+def open_upload(uploaded_file):
+    """Open an uploaded PDF without copying it into a new bytes object.
+
+    The upload's buffer is written to a temp file straight from a memoryview
+    and MuPDF reads it from disk; the doc and file are released on exit.
+    """
+    tmp = tempfile.NamedTemporaryFile(suffix=".pdf", delete=False)
+    try:
+        with tmp, uploaded_file.getbuffer() as buf:
+            tmp.write(buf)
+        doc = fitz.open(tmp.name)
+        try:
+            yield doc
+        finally:
+            doc.close()
+    finally:
+        os.remove(tmp.name)
+
+
+def _triage(page, text: str) -> str:
+    chars = len("".join(text.split()))
+    if chars >= MIN_PAGE_CHARS:
+        return "text"
+    # get_images() only lists the page's image resources, nothing is decoded
+    if page.get_images(full=False):
+        return "image_only" if chars == 0 else "low_text"
+    return "empty" if chars == 0 else "low_text"
+
+
+def extract_pages(doc) -> DocumentText:
+    """Extract text page by page, tagging each page with its triage status."""
+    pages = []
+    for page in doc:
+        text = page.get_text("text", flags=EXTRACT_FLAGS)
+        status = _triage(page, text)
+        if status in ("image_only", "low_text") and _ocr_hook is not None:
+            try:
+                ocr_text = _ocr_hook(page) or ""
+            except Exception:
+                log.exception("OCR hook failed on page %d", page.number + 1)
+                ocr_text = ""
+            if len(ocr_text.strip()) > len(text.strip()):
+                text, status = ocr_text, "ocr"
+        pages.append({"page": page.number + 1, "text": text, "status": status})
+    return DocumentText(pages)
+
+
+def pages_needing_ocr(pages: DocumentText) -> List[int]:
+    return [p["page"] for p in pages if p["status"] in ("image_only", "low_text")]
+
+
+def has_usable_text(pages: DocumentText) -> bool:
+    """False when no page has a real text layer, i.e. an LLM call would summarise nothing."""
+    return any(p["status"] in ("text", "ocr") for p in pages)
+
+
+# --- BENCHMARK ---
+# python pdf_extract.py file1.pdf [file2.pdf ...]
+def _benchmark(path: str, rounds: int = 5):
+    def per_page_ms(fn):
+        best = float("inf")
+        for _ in range(rounds):
+            with fitz.open(path) as doc:
+                start = time.perf_counter()
+                fn(doc)
+                best = min(best, time.perf_counter() - start)
+                n = doc.page_count
+        return best * 1000 / max(n, 1), n
+
+    before, n = per_page_ms(lambda doc: "".join([page.get_text() for page in doc]))
+    after, _ = per_page_ms(extract_pages)
+    with fitz.open(path) as doc:
+        pages = extract_pages(doc)
+    flagged = pages_needing_ocr(pages)
+    print(f"{path}: {n} pages, before {before:.3f} ms/page, after {after:.3f} ms/page, "
+          f"no text layer on pages {flagged or '-'}")
+
+
+def _peak_rss_kb(path: str, variant: str, queue):
+    # runs in a fresh process so ru_maxrss reflects this variant only (Linux reports KB)
+    import resource
+    with open(path, "rb") as f:
+        upload = BytesIO(f.read())
+    baseline = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    if variant == "before":
+        doc = fitz.open(stream=upload.read(), filetype="pdf")
+        text = "".join([page.get_text() for page in doc])
+        text.lower()  # old keyword scan
+    else:
+        with open_upload(upload) as doc:
+            pages = extract_pages(doc)
+        for text in pages.texts():
+            text.lower()
+    queue.put(resource.getrusage(resource.RUSAGE_SELF).ru_maxrss - baseline)
+
+
+def _peak_memory(path: str):
+    import multiprocessing
+    ctx = multiprocessing.get_context("spawn")
+    result = {}
+    for variant in ("before", "after"):
+        queue = ctx.Queue()
+        proc = ctx.Process(target=_peak_rss_kb, args=(path, variant, queue))
+        proc.start()
+        result[variant] = queue.get()
+        proc.join()
+    print(f"{path}: {os.path.getsize(path) / 1024:.0f} KB file, extra peak RSS per session "
+          f"before {result['before']} KB, after {result['after']} KB")
+
+
+if __name__ == "__main__":
+    for pdf_path in sys.argv[1:]:
+        _benchmark(pdf_path)
+        _peak_memory(pdf_path)
@@ -1,23 +1,66 @@
-import re
+import hashlib
+import threading
+from collections import OrderedDict
 from typing import List, Dict
 
-def detect_red_flags(text: str) -> List[Dict[str, str]]:
-    red_flags = [
-        {"pattern": r"\b(indefinite|perpetual)\b", "risk": "Unclear or unlimited duration obligation"},
-        {"pattern": r"\bwithout cause\b", "risk": "Can fire/evict you with no reason"},
-        {"pattern": r"assign(\\s+all)?\\s+(inventions|IP|intellectual property)", "risk": "You may lose your IP"},
-        {"pattern": r"liable for.*damages|responsible for all.*damages", "risk": "You pay all damage costs"},
-        {"pattern": r"landlord.*terminate.*any time", "risk": "Landlord can evict you unfairly"},
-        {"pattern": r"penalty of.*\\$\\d+", "risk": "Big penalty fees"},
-        {"pattern": r"non[- ]?compete", "risk": "Can't work for similar jobs"},
-        {"pattern": r"no refund", "risk": "No refund if things go wrong"}
-    ]
+from rule_packs import load_rule_pack, DEFAULT_PACK
+
+SCAN_CACHE_SIZE = 256
+
+_scan_cache = OrderedDict()
+_scan_lock = threading.Lock()
+
+
+def _chunks(text) -> List[str]:
+    # a plain string, or a page-by-page DocumentText that is never joined here
+    return [text] if isinstance(text, str) else list(text.texts())
+
+
+def _digest(text) -> str:
+    return hashlib.sha256(text.encode()).hexdigest() if isinstance(text, str) else text.digest()
+
+
+def detect_red_flags(text, pack: Dict = None) -> List[Dict[str, str]]:
+    pack = pack or load_rule_pack(DEFAULT_PACK)
+    chunks = _chunks(text)
     results = []
     seen = set()
-    for rule in red_flags:
-        for match in re.finditer(rule["pattern"], text, re.IGNORECASE):
+    for pattern, risk in pack["red_flags"]:
+        for match in (m for chunk in chunks for m in pattern.finditer(chunk)):
             clause = match.group(0).strip()
-            if (clause, rule["risk"]) not in seen:
-                seen.add((clause, rule["risk"]))
-                results.append({"clause": clause, "risk": rule["risk"]})
+            if (clause, risk) not in seen:
+                seen.add((clause, risk))
+                results.append({"clause": clause, "risk": risk})
     return results
+
+
+def find_risky_terms(text, pack: Dict = None) -> List[str]:
+    pack = pack or load_rule_pack(DEFAULT_PACK)
+    found = set()
+    for chunk in _chunks(text):
+        lowered = chunk.lower()
+        found.update(keyword for keyword, needle in zip(pack["keywords"], pack["keywords_lower"]) if needle in lowered)
+    return [keyword for keyword in pack["keywords"] if keyword in found]
+
+
+def scan_document(text, pack_name: str = DEFAULT_PACK) -> Dict:
+    """Keyword + red-flag scan, cached by (document hash, rule-pack version)."""
+    pack = load_rule_pack(pack_name)
+    key = (_digest(text), pack["version"])
+
+    with _scan_lock:
+        if key in _scan_cache:
+            _scan_cache.move_to_end(key)
+            return _scan_cache[key]
+
+    result = {
+        "pack": pack["version"],
+        "risky_terms": find_risky_terms(text, pack),
+        "red_flags": detect_red_flags(text, pack),
+    }
+
+    with _scan_lock:
+        _scan_cache[key] = result
+        if len(_scan_cache) > SCAN_CACHE_SIZE:
+            _scan_cache.popitem(last=False)
+    return result
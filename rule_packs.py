@@ -0,0 +1,107 @@
+import os
+import re
+import json
+import hashlib
+import logging
+import threading
+from typing import Dict
+
+RULES_DIR = "rules"
+DEFAULT_PACK = "default"
+
+_packs: Dict[str, Dict] = {}
+_lock = threading.RLock()
+log = logging.getLogger("legallite.rules")
+
+
+def _pack_path(name: str) -> str:
+    return os.path.join(RULES_DIR, f"{name}.json")
+
+
+def _parse(name: str, raw: bytes) -> Dict:
+    """Decode a pack file and check its shape; anything malformed raises ValueError."""
+    spec = json.loads(raw)
+    if not isinstance(spec, dict):
+        raise ValueError(f"rule pack {name}: top level must be an object")
+    keywords = spec.get("keywords", [])
+    # a bare string would otherwise be iterated into one-letter keywords that match everything
+    if not isinstance(keywords, list) or not all(isinstance(k, str) and k.strip() for k in keywords):
+        raise ValueError(f"rule pack {name}: 'keywords' must be a list of non-empty strings")
+    red_flags = spec.get("red_flags", [])
+    if not isinstance(red_flags, list) or not all(
+            isinstance(rule, dict) and isinstance(rule.get("pattern"), str) and rule["pattern"]
+            and isinstance(rule.get("risk"), str) for rule in red_flags):
+        raise ValueError(f"rule pack {name}: 'red_flags' must be a list of {{\"pattern\", \"risk\"}} objects")
+    if spec.get("extends") is not None and not isinstance(spec["extends"], str):
+        raise ValueError(f"rule pack {name}: 'extends' must be a pack name")
+    return spec
+
+
+def _compile(name: str, raw: bytes, spec: Dict, parent: Dict = None) -> Dict:
+    digest = hashlib.sha256(raw).hexdigest()[:8]
+    version = f"{name}@{spec.get('version', '0')}+{digest}"
+
+    keywords = list(parent["keywords"]) if parent else []
+    red_flags = list(parent["red_flags"]) if parent else []
+    if parent:
+        version = f"{parent['version']}/{version}"
+
+    for keyword in spec.get("keywords", []):
+        if keyword not in keywords:
+            keywords.append(keyword)
+    for rule in spec.get("red_flags", []):
+        red_flags.append((re.compile(rule["pattern"], re.IGNORECASE), rule["risk"]))
+
+    return {
+        "name": name,
+        "version": version,
+        "keywords": keywords,
+        "keywords_lower": [k.lower() for k in keywords],
+        "red_flags": red_flags,
+        "extends": spec.get("extends"),
+        "parent_version": parent["version"] if parent else None,
+    }
+
+
+def load_rule_pack(name: str = DEFAULT_PACK) -> Dict:
+    """Return the compiled rule pack, re-reading the file only when it changed on disk."""
+    path = _pack_path(name)
+    try:
+        stat = os.stat(path)
+        stamp = (stat.st_mtime_ns, stat.st_size)
+    except OSError:
+        stamp = None  # deleted or unreadable: handled like an invalid edit below
+
+    pack = _packs.get(name)
+    if pack and pack["_stamp"] == stamp:
+        if not pack["extends"] or load_rule_pack(pack["extends"])["version"] == pack["parent_version"]:
+            return pack
+
+    with _lock:
+        try:
+            with open(path, "rb") as f:
+                raw = f.read()
+            spec = _parse(name, raw)
+            parent = load_rule_pack(spec["extends"]) if spec.get("extends") else None
+            compiled = _compile(name, raw, spec, parent)
+        except (OSError, ValueError, re.error):
+            if not pack:
+                raise
+            # a bad edit must not take scanning down: keep serving the last good pack
+            log.exception("Rule pack %s is invalid; still using %s", name, pack["version"])
+            pack["_stamp"] = stamp
+            if pack["extends"]:
+                pack["parent_version"] = load_rule_pack(pack["extends"])["version"]
+            return pack
+        compiled["_stamp"] = stamp
+        _packs[name] = compiled
+    return compiled
+
+
+def pack_for_document(filename: str) -> str:
+    """Pick a contract-specific pack from the file name, falling back to the default pack."""
+    name = (filename or "").lower()
+    for pack in ("rental", "nda", "employment"):
+        if pack in name and os.path.exists(_pack_path(pack)):
+            return pack
+    return DEFAULT_PACK
@@ -0,0 +1,99 @@
+import os
+import random
+
+import numpy as np
+
+import clause_index
+
+CONTRACT = """1. Indemnity. The Tenant shall indemnify and hold harmless the Landlord from all claims, damages and losses arising from use of the premises.
+
+2. Rent. The Tenant shall pay rent of Rs 18000 on or before the 5th day of each month without any deduction.
+"""
+
+
+def test_similar_clause_is_ranked_first(tmp_path, monkeypatch):
+    monkeypatch.setattr(clause_index, "INDEX_DIR", str(tmp_path))
+    clause_index.index_document("a@b.c", "rental.pdf", CONTRACT)
+
+    hits = clause_index.find_similar_clauses("a@b.c", "tenant will indemnify the landlord against claims", k=2)
+
+    assert hits[0]["filename"] == "rental.pdf"
+    assert "indemnify" in hits[0]["clause"]
+    assert hits[0]["score"] > hits[1]["score"]
+
+
+def test_same_upload_is_indexed_once(tmp_path, monkeypatch):
+    monkeypatch.setattr(clause_index, "INDEX_DIR", str(tmp_path))
+    assert clause_index.index_document("a@b.c", "rental.pdf", CONTRACT) == 2
+    assert clause_index.index_document("a@b.c", "rental.pdf", CONTRACT) == 0
+
+    hits = clause_index.find_similar_clauses("a@b.c", "tenant indemnify landlord", k=5)
+    assert len(hits) == 2
+
+
+def test_other_users_index_is_separate(tmp_path, monkeypatch):
+    monkeypatch.setattr(clause_index, "INDEX_DIR", str(tmp_path))
+    clause_index.index_document("a@b.c", "rental.pdf", CONTRACT)
+    assert clause_index.find_similar_clauses("x@y.z", "tenant indemnify landlord") == []
+
+
+def test_shortlist_keeps_the_best_match_for_stopword_heavy_clauses(tmp_path, monkeypatch):
+    monkeypatch.setattr(clause_index, "INDEX_DIR", str(tmp_path))
+    monkeypatch.setattr(clause_index, "CANDIDATES", 256)  # the shortlist prunes: 256 of 3000 clauses
+
+    rng = random.Random(0)
+    stop = "the shall of and to in be by any or such this a with for as on all that from".split()
+    words = [f"term{i}" for i in range(500)] + "tenant landlord claims premises party notice".split()
+
+    def text(n_words):
+        return " ".join(rng.choice(stop) if rng.random() < 0.6 else rng.choice(words) for _ in range(n_words))
+
+    clauses = [text(30).capitalize() + "." for _ in range(3000)]
+    clauses[1234] = ("The Tenant shall indemnify and hold harmless the Landlord from and against all of the "
+                     "claims of any kind that may be made by any third party in respect of the premises.")
+    for d in range(3):
+        clause_index.index_document("a@b.c", f"doc{d}.pdf", "\n\n".join(clauses[d * 1000:(d + 1) * 1000]))
+
+    paths = clause_index._paths("a@b.c")
+    vectors = np.fromfile(paths["vec"], dtype=np.int8).reshape(-1, clause_index.DIM).astype(np.float32)
+    idf = clause_index._idf(clause_index._load_df(paths["df"]))
+
+    def brute_force_best(query):
+        q = clause_index._normalize(np.log1p(clause_index._hashed_counts(query)) * idf)
+        return (vectors @ q / 127).max()
+
+    query = "tenant will indemnify the landlord against claims"
+    assert "indemnify" in clause_index.find_similar_clauses("a@b.c", query, k=1)[0]["clause"]
+
+    queries = [text(8) for _ in range(100)]
+    found = sum(clause_index.find_similar_clauses("a@b.c", q, k=1)[0]["score"] >= brute_force_best(q) - 1e-6
+                for q in queries)
+    assert found >= 93  # vs brute force; raw-TF signatures found 89 and missed the indemnity clause
+
+
+def test_crash_part_way_through_a_save_is_rolled_back(tmp_path, monkeypatch):
+    monkeypatch.setattr(clause_index, "INDEX_DIR", str(tmp_path))
+    clause_index.index_document("a@b.c", "rental.pdf", CONTRACT)
+
+    real_open = open
+
+    def crash_on_signatures(path, *args, **kwargs):
+        if str(path).endswith(".sig"):
+            raise OSError("disk full")
+        return real_open(path, *args, **kwargs)
+    monkeypatch.setattr("builtins.open", crash_on_signatures)
+    other = CONTRACT.replace("Tenant", "Licensee")
+    try:
+        clause_index.index_document("a@b.c", "licence.pdf", other)
+    except OSError:
+        pass
+    monkeypatch.setattr("builtins.open", real_open)
+
+    # the half-written save is invisible, then redone cleanly
+    assert len(clause_index.find_similar_clauses("a@b.c", "licensee indemnify", k=10)) == 2
+    assert clause_index.index_document("a@b.c", "licence.pdf", other) == 2
+    paths = clause_index._paths("a@b.c")
+    sizes = {key: os.path.getsize(paths[key]) for key in ("off", "vec", "sig")}
+    assert sizes == {"off": 4 * 8, "vec": 4 * clause_index.DIM, "sig": 4 * clause_index.SIG_WORDS * 8}
+    hits = clause_index.find_similar_clauses("a@b.c", "licensee indemnify", k=1)
+    assert hits[0]["filename"] == "licence.pdf" and "Licensee" in hits[0]["clause"]
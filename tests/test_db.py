@@ -0,0 +1,140 @@
+import os
+import json
+import threading
+from contextlib import closing
+
+import pytest
+
+import db
+
+psycopg2 = pytest.importorskip("psycopg2")
+from psycopg2.pool import ThreadedConnectionPool  # noqa: E402
+
+
+# --- SQLITE ---
+def test_sqlite_roundtrip(tmp_path):
+    storage = db.SQLiteStorage(str(tmp_path / "users.db"))
+    storage.init_db()
+    assert storage.register_user("a@b.c", "hash")
+    assert not storage.register_user("a@b.c", "hash")
+    assert storage.login_user("a@b.c", "hash")[1] == "a@b.c"
+    assert storage.login_user("a@b.c", "wrong") is None
+
+    storage.save_uploads([("a@b.c", "one.pdf", "s1", "2025-01-01 10:00:00"),
+                          ("a@b.c", "two.pdf", "s2", "2025-01-02 10:00:00")])
+    assert [row[0] for row in storage.get_user_history("a@b.c")] == ["two.pdf", "one.pdf"]
+
+
+# --- POSTGRES against a real local server ---
+# Uses LEGALLITE_TEST_DATABASE_URL if set, otherwise starts a throwaway server with
+# pgserver (pip install pgserver); skipped when neither is available.
+@pytest.fixture(scope="session")
+def dsn(tmp_path_factory):
+    url = os.environ.get("LEGALLITE_TEST_DATABASE_URL")
+    if url:
+        yield url
+        return
+    pgserver = pytest.importorskip("pgserver")
+    try:
+        server = pgserver.get_server(str(tmp_path_factory.mktemp("pg")), cleanup_mode="stop")
+    except Exception as e:
+        pytest.skip(f"could not start a local PostgreSQL: {e}")
+    yield server.get_uri()
+    server.cleanup()
+
+
+def query(dsn, sql):
+    with closing(psycopg2.connect(dsn)) as conn, conn, conn.cursor() as c:
+        c.execute(sql)
+        return c.fetchall() if c.description else None
+
+
+@pytest.fixture
+def storage(dsn, tmp_path, monkeypatch):
+    monkeypatch.setattr(db, "DEAD_LETTER_PATH", str(tmp_path / "failed_uploads.jsonl"))
+    query(dsn, "DROP TABLE IF EXISTS users, uploads")
+    # a long flush interval keeps the background thread out of the way; tests flush explicitly
+    storage = db.PostgresStorage(dsn, batch_size=3, flush_seconds=3600)
+    storage.init_db()
+    yield storage
+    storage.pool.closeall()
+
+
+def row(name, summary="summary"):
+    return ("a@b.c", name, summary, f"2025-01-01 10:00:{len(name):02d}")
+
+
+def stored(dsn):
+    return sorted(r[0] for r in query(dsn, "SELECT filename FROM uploads"))
+
+
+def test_register_and_login(storage):
+    assert storage.register_user("a@b.c", "hash")
+    assert not storage.register_user("a@b.c", "hash")  # IntegrityError -> False
+    assert storage.login_user("a@b.c", "hash")[1:] == ("a@b.c", "hash")
+    assert storage.login_user("a@b.c", "nope") is None
+
+
+def test_uploads_are_written_in_batches(storage, dsn):
+    storage.save_uploads([row("a.pdf")])
+    storage.save_uploads([row("bb.pdf")])
+    assert stored(dsn) == []
+
+    storage.save_uploads([row("ccc.pdf")])  # fills the batch
+    assert stored(dsn) == ["a.pdf", "bb.pdf", "ccc.pdf"]
+    # rows written by one transaction share xmin: it was a single multi-row INSERT
+    assert len(query(dsn, "SELECT DISTINCT xmin::text FROM uploads")) == 1
+
+
+def test_history_reads_its_own_buffered_writes(storage):
+    storage.save_uploads([row("a.pdf")])
+    assert [r[0] for r in storage.get_user_history("a@b.c")] == ["a.pdf"]
+
+
+def test_history_waits_for_a_flush_in_progress(storage, dsn):
+    # EXCLUSIVE blocks the INSERT but not the history SELECT
+    with closing(psycopg2.connect(dsn)) as blocker:
+        blocker.cursor().execute("LOCK TABLE uploads IN EXCLUSIVE MODE")
+        storage.save_uploads([row("a.pdf")])
+        background = threading.Thread(target=storage.flush)
+        background.start()
+        threading.Timer(0.3, blocker.rollback).start()
+
+        history = storage.get_user_history("a@b.c")
+        background.join()
+    assert [r[0] for r in history] == ["a.pdf"]
+
+
+def test_bad_row_is_isolated_and_dead_lettered(storage, dsn):
+    # psycopg2 rejects the NUL byte client-side with a ValueError
+    storage.save_uploads([row("a.pdf"), row("bad.pdf", "nul\x00byte"), row("ccc.pdf")])
+    assert stored(dsn) == ["a.pdf", "ccc.pdf"]
+
+    for _ in range(db.MAX_WRITE_ATTEMPTS - 1):
+        storage.flush()
+    assert storage._pending == []
+    with open(db.DEAD_LETTER_PATH) as f:
+        assert [json.loads(line)["filename"] for line in f] == ["bad.pdf"]
+
+
+def test_outage_keeps_rows_queued_without_raising(storage, dsn):
+    pool = storage.pool
+    # nothing listens on port 1: getconn raises the driver's real OperationalError
+    storage.pool = ThreadedConnectionPool(0, 1, "host=127.0.0.1 port=1 connect_timeout=1")
+    storage.save_uploads([row("a.pdf"), row("bb.pdf"), row("ccc.pdf")])  # flush fails, nothing raised
+    assert storage.flush() == 3
+
+    storage.pool = pool
+    assert storage.flush() == 0
+    assert stored(dsn) == ["a.pdf", "bb.pdf", "ccc.pdf"]
+
+
+def test_unexpected_error_puts_the_batch_back(storage, monkeypatch):
+    storage.save_uploads([row("a.pdf")])
+
+    def interrupted(entries):
+        raise KeyboardInterrupt
+    monkeypatch.setattr(storage, "_insert", interrupted)
+    with pytest.raises(KeyboardInterrupt):
+        storage.flush()
+    assert [entry[0] for entry in storage._pending] == [row("a.pdf")]
@@ -0,0 +1,85 @@
+import threading
+import time
+
+import pytest
+
+import llm_guard
+
+
+def run_concurrently(calls):
+    results = [None] * len(calls)
+
+    def worker(i, fn):
+        try:
+            results[i] = fn()
+        except Exception as e:
+            results[i] = e
+
+    threads = [threading.Thread(target=worker, args=(i, fn)) for i, fn in enumerate(calls)]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+    return results
+
+
+def test_identical_requests_share_one_call():
+    calls = []
+
+    def upstream():
+        calls.append(1)
+        time.sleep(0.2)
+        return "summary"
+
+    key = llm_guard.request_key("doc", "openai", "prompt", "key-a")
+    results = run_concurrently([lambda: llm_guard.single_flight(key, upstream)] * 5)
+
+    assert results == ["summary"] * 5
+    assert len(calls) == 1
+
+
+def test_different_api_keys_do_not_share_calls_or_errors():
+    def call_with(api_key):
+        def upstream():
+            time.sleep(0.2)
+            if api_key == "bad":
+                raise RuntimeError("401 invalid key")
+            return "ok"
+        return lambda: llm_guard.single_flight(llm_guard.request_key("doc", "openai", "prompt", api_key), upstream)
+
+    bad, good = run_concurrently([call_with("bad"), call_with("good")])
+
+    assert isinstance(bad, RuntimeError)
+    assert good == "ok"
+
+
+def test_follower_gives_up_after_timeout():
+    release = threading.Event()
+    key = llm_guard.request_key("doc", "huggingface", "prompt", "token")
+    leader = threading.Thread(target=llm_guard.single_flight, args=(key, release.wait))
+    leader.start()
+    time.sleep(0.05)
+    try:
+        with pytest.raises(TimeoutError):
+            llm_guard.single_flight(key, lambda: "unused", timeout=0.1)
+    finally:
+        release.set()
+        leader.join()
+
+
+def test_token_bucket_queues_bursts():
+    bucket = llm_guard.TokenBucket(rate=20, capacity=2)
+    start = time.monotonic()
+    for _ in range(4):
+        bucket.acquire()
+    # 2 from the burst, 2 more at 20/s
+    assert time.monotonic() - start >= 0.09
+
+
+def test_token_bucket_gives_up_instead_of_waiting_forever():
+    bucket = llm_guard.TokenBucket(rate=1, capacity=1)
+    bucket.acquire()
+    start = time.monotonic()
+    with pytest.raises(TimeoutError, match="Rate limit"):
+        bucket.acquire(timeout=0.2)  # next token is 1s away: fail now rather than sleep
+    assert time.monotonic() - start < 0.1
@@ -0,0 +1,85 @@
+from io import BytesIO
+
+import fitz
+import pytest
+
+import pdf_extract
+
+TEXT = "The Tenant shall pay a late fee of Rs 500 if rent is not paid by the 5th. "
+
+
+def make_pdf():
+    """Three pages: real text, a scanned-looking image-only page, and a blank page."""
+    doc = fitz.open()
+    doc.new_page().insert_textbox(fitz.Rect(50, 50, 550, 800), TEXT * 5)
+    scanned = doc.new_page()
+    pix = fitz.Pixmap(fitz.csRGB, fitz.IRect(0, 0, 60, 80), False)
+    pix.clear_with(200)
+    scanned.insert_image(scanned.rect, stream=pix.tobytes("png"))
+    doc.new_page()
+    data = doc.tobytes()
+    doc.close()
+    return data
+
+
+@pytest.fixture
+def upload():
+    return BytesIO(make_pdf())
+
+
+@pytest.fixture(autouse=True)
+def no_ocr():
+    yield
+    pdf_extract.set_ocr_hook(None)
+
+
+def extract(upload):
+    with pdf_extract.open_upload(upload) as doc:
+        return pdf_extract.extract_pages(doc)
+
+
+def test_triage_tags_each_page(upload):
+    pages = extract(upload)
+    assert [p["status"] for p in pages] == ["text", "image_only", "empty"]
+    assert pdf_extract.pages_needing_ocr(pages) == [2]
+    assert pdf_extract.has_usable_text(pages)
+    assert "late fee" in str(pages)
+
+
+def test_ocr_hook_fills_image_only_pages(upload):
+    seen = []
+
+    def stub_ocr(page):
+        seen.append(page.number + 1)
+        return "OCR: the deposit is non-refundable."
+
+    pdf_extract.set_ocr_hook(stub_ocr)
+    pages = extract(upload)
+
+    assert seen == [2]
+    assert pages[1]["status"] == "ocr"
+    assert pages[1]["text"].startswith("OCR:")
+    assert pdf_extract.pages_needing_ocr(pages) == []
+
+
+def test_failing_ocr_hook_keeps_page_status(upload):
+    def broken_ocr(page):
+        raise RuntimeError("ocr engine crashed")
+
+    pdf_extract.set_ocr_hook(broken_ocr)
+    pages = extract(upload)
+
+    assert [p["status"] for p in pages] == ["text", "image_only", "empty"]
+
+
+def test_image_only_document_has_no_usable_text():
+    doc = fitz.open(stream=make_pdf(), filetype="pdf")
+    doc.select([1, 2])
+    pages = pdf_extract.extract_pages(doc)
+    assert not pdf_extract.has_usable_text(pages)
+
+
+def test_document_text_digest_matches_joined_text(upload):
+    import hashlib
+    pages = extract(upload)
+    assert pages.digest() == hashlib.sha256(str(pages).encode()).hexdigest()
@@ -0,0 +1,78 @@
+import os
+
+import fitz
+import pytest
+
+import pdf_extract
+
+pytest.importorskip("streamlit")
+from streamlit.testing.v1 import AppTest
+
+REPO = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+APP_PAGES = ["📑 Upload & Simplify", "👤 Profile", "🚨 Risky Terms Detector", "⏳ My History", "❓ Help & Feedback"]
+MAX_RERUN_BYTES = 6 * 1024
+
+
+@pytest.fixture
+def app(tmp_path, monkeypatch):
+    # the app resolves rules/, users.db, clause_index/ and the Help assets relative to the working directory
+    monkeypatch.chdir(tmp_path)
+    os.symlink(os.path.join(REPO, "rules"), tmp_path / "rules")
+    # stand-ins for the Help page's flowchart and sample contracts, which are not in the repo
+    fitz.Pixmap(fitz.csRGB, fitz.IRect(0, 0, 8, 8), False).save(str(tmp_path / "flowchart.jpeg.jpeg"), output="jpeg")
+    for name in ("Sample_Rental_Agreement.pdf", "Sample_NDA_Agreement.pdf", "Sample_Employment_Contract.pdf"):
+        (tmp_path / name).write_bytes(contract_pdf(1))
+    at = AppTest.from_file(os.path.join(REPO, "app.py"), default_timeout=60)
+    at.run()
+    return at
+
+
+def log_in(at, choose_mode=True):
+    at.session_state["logged_in"] = True
+    at.session_state["user_email"] = "a@b.c"
+    at.session_state["mode"] = "Demo Mode"
+    at.session_state["mode_chosen"] = choose_mode
+    at.run()
+
+
+@pytest.mark.parametrize("page", ["Login", "Mode Selection"] + APP_PAGES)
+def test_rerun_payload_is_bounded_and_css_free(app, page):
+    if page == "Mode Selection":
+        log_in(app, choose_mode=False)
+    elif page != "Login":
+        log_in(app)
+        app.sidebar.radio(key="nav").set_value(page).run()
+    app.run()  # the measured rerun: same page, nothing changed
+
+    assert not app.exception
+    metrics = app.session_state["render_metrics"]
+    assert metrics["page"] == page
+    assert 0 < metrics["bytes"] < MAX_RERUN_BYTES
+    assert not any("<style>" in md.value for md in app.markdown)
+
+
+def contract_pdf(pages=6):
+    doc = fitz.open()
+    for n in range(pages):
+        doc.new_page().insert_text((50, 72), f"Clause {n + 1}. A late fee and a penalty apply on breach.")
+    return doc.tobytes()
+
+
+def test_viewer_page_turns_reuse_the_extraction(app, monkeypatch):
+    log_in(app)
+    calls = []
+    real = pdf_extract.extract_pages
+    monkeypatch.setattr(pdf_extract, "extract_pages", lambda doc: calls.append(1) or real(doc))
+
+    app.sidebar.radio(key="nav").set_value("🚨 Risky Terms Detector").run()
+    app.file_uploader[0].set_value(("contract.pdf", contract_pdf(), "application/pdf")).run()
+    assert len(calls) == 1
+
+    app.number_input(key="risk_viewer_page").set_value(3).run()
+    app.selectbox(key="risk_viewer_hit").set_value(("penalty", 5)).run()
+    assert not app.exception
+    assert app.session_state["risk_viewer_page"] == 5
+    assert len(calls) == 1
+
+    app.file_uploader[0].set_value(("other.pdf", contract_pdf(2), "application/pdf")).run()
+    assert len(calls) == 2
@@ -0,0 +1,78 @@
+import json
+import os
+
+import pytest
+
+import rule_packs
+from red_flag_detector import scan_document
+
+
+def write_pack(directory, name, spec):
+    path = directory / f"{name}.json"
+    path.write_text(json.dumps(spec))
+    return path
+
+
+def bump_mtime(path):
+    stat = os.stat(path)
+    os.utime(path, ns=(stat.st_atime_ns, stat.st_mtime_ns + 1_000_000))
+
+
+@pytest.fixture
+def rules_dir(tmp_path, monkeypatch):
+    monkeypatch.setattr(rule_packs, "RULES_DIR", str(tmp_path))
+    monkeypatch.setattr(rule_packs, "_packs", {})
+    write_pack(tmp_path, "default", {"version": "1", "keywords": ["penalty"],
+                                     "red_flags": [{"pattern": "no refund", "risk": "No refund"}]})
+    return tmp_path
+
+
+def test_child_pack_extends_default(rules_dir):
+    write_pack(rules_dir, "rental", {"version": "1", "extends": "default", "keywords": ["sublet"]})
+    pack = rule_packs.load_rule_pack("rental")
+    assert pack["keywords"] == ["penalty", "sublet"]
+    assert pack["version"].startswith("default@1+")
+
+
+def test_edit_is_hot_reloaded_and_changes_version(rules_dir):
+    before = scan_document("Penalty applies. Sublet allowed.", "default")
+    path = write_pack(rules_dir, "default", {"version": "2", "keywords": ["penalty", "sublet"]})
+    bump_mtime(path)
+    after = scan_document("Penalty applies. Sublet allowed.", "default")
+    assert before["risky_terms"] == ["penalty"]
+    assert after["risky_terms"] == ["penalty", "sublet"]
+    assert before["pack"] != after["pack"]
+
+
+@pytest.mark.parametrize("junk", [
+    "{not json",
+    "[]",
+    json.dumps({"keywords": "penalty"}),
+    json.dumps({"keywords": ["penalty", 3]}),
+    json.dumps({"red_flags": [{"pattern": "(", "risk": "x"}]}),
+    json.dumps({"red_flags": [{"risk": "no pattern"}]}),
+    json.dumps({"red_flags": "no refund"}),
+    json.dumps({"extends": ["default"]}),
+])
+def test_bad_edit_keeps_last_good_pack(rules_dir, junk):
+    good = rule_packs.load_rule_pack("default")
+    path = rules_dir / "default.json"
+    path.write_text(junk)
+    bump_mtime(path)
+
+    assert rule_packs.load_rule_pack("default") is good
+    assert scan_document("A penalty applies.", "default")["risky_terms"] == ["penalty"]
+
+
+def test_deleted_pack_keeps_last_good_pack(rules_dir):
+    good = rule_packs.load_rule_pack("default")
+    os.remove(rules_dir / "default.json")
+
+    assert rule_packs.load_rule_pack("default") is good
+    assert scan_document("A penalty applies.", "default")["risky_terms"] == ["penalty"]
+
+
+def test_bad_pack_without_previous_version_raises(rules_dir):
+    (rules_dir / "nda.json").write_text("{not json")
+    with pytest.raises(ValueError):
+        rule_packs.load_rule_pack("nda")